@@ -1,9 +1,11 @@
 from PyQt6.QtWidgets import *
-from PyQt6.QtCore import QRegularExpression, QTimer
+from PyQt6.QtCore import QCoreApplication, QRegularExpression, QThreadPool, QTimer, pyqtSignal
 from PyQt6.QtGui import QRegularExpressionValidator
 from voting_app import *
-import csv
+import mmap
 import os
+import sqlite3
+import sys
 
 
 class Logic(QMainWindow, Ui_MainWindow):
@@ -11,52 +13,105 @@ class Logic(QMainWindow, Ui_MainWindow):
         Logic class for managing the voting application.
 
         This class inherits from QMainWindow and Ui_MainWindow. It handles user interactions, checks inputs,
-        saves votes to a CSV file, and shows the voting results.
+        saves votes to a SQLite database on a background thread, and shows the voting results.
 
         Attributes:
             candidates (list[str]): A list of candidate names.
             error_message_color (str): CSS style for error messages.
             success_message_color (str): CSS style for success messages.
-            csv_file (str): The name of the CSV file where votes are saved.
+            db_file (str): The name of the SQLite database where votes are saved.
+            csv_file (str): The name of the CSV file used by earlier versions, imported into a new database.
+            _CANDIDATE_COLUMN (int): The position of the chosen candidate in a CSV row.
+            _NAME_RE (QRegularExpression): The pattern accepted by the name fields.
+            _DIGIT_RE (QRegularExpression): The pattern accepted by each voting ID digit field.
+            _NAME_VALIDATOR (QRegularExpressionValidator): The validator shared by both name fields.
+            _DIGIT_VALIDATOR (QRegularExpressionValidator): The validator shared by all five digit fields.
+            _save_failed (pyqtSignal): Emitted from the I/O thread with the voting ID, candidate and error
+                message of a vote that could not be written.
+            _vote_rejected (pyqtSignal): Emitted from the I/O thread with the voting ID and candidate of a vote
+                whose voting ID was already in the database.
         """
-    candidates: list[str] = ["Jane", "John"]
+    candidates: list[str] = [sys.intern("Jane"), sys.intern("John")]
     error_message_color: str = "color: red;"
     success_message_color: str = "color: green;"
+    db_file: str = "votes.db"
     csv_file: str = "votes.csv"
+    _CANDIDATE_COLUMN: int = 3
+    _NAME_RE: QRegularExpression = QRegularExpression("[a-zA-Z-']+")
+    _DIGIT_RE: QRegularExpression = QRegularExpression("[0-9]")
+    _NAME_VALIDATOR: QRegularExpressionValidator | None = None
+    _DIGIT_VALIDATOR: QRegularExpressionValidator | None = None
+    _save_failed = pyqtSignal(str, str, str)
+    _vote_rejected = pyqtSignal(str, str)
 
     def __init__(self) -> None:
         """
-            Initializes the Logic class, sets up the user interface, creates a list of
+            Initializes the Logic class, sets up the user interface, creates a tuple of
             digit inputs, and links button clicks to their corresponding method.
 
             Attributes:
-                self.digit_inputs: A list of QLineEdit widgets for digit inputs.
+                self.digit_inputs: A tuple of QLineEdit widgets for digit inputs.
+                self._all_fields: The name inputs followed by the digit inputs.
+                self._btn_to_name: Maps each candidate radio button to its candidate's name.
+                self._conn: The connection to the votes database.
+                self._used_ids: The voting IDs that have already been used.
+                self._stats: The running vote count for each candidate.
+                self._io_pool: A single-thread pool that writes votes to the database in order.
+                self._msg_shown: Whether the message label currently shows a message.
         """
         super().__init__()
         self.setupUi(self)
 
-        self.digit_inputs: list = [
+        self.digit_inputs: tuple = (
             self.input_first_digit, self.input_second_digit,
             self.input_third_digit, self.input_fourth_digit,
             self.input_fifth_digit
-        ]
+        )
+        self._all_fields: tuple = (self.input_first_name, self.input_last_name, *self.digit_inputs)
+        self._btn_to_name: dict = {
+            self.first_candidate_button: self.candidates[0],
+            self.second_candidate_button: self.candidates[1]
+        }
+
+        self._conn: sqlite3.Connection | None = None
+        self._used_ids: set[str] = set()
+        self._stats: dict[str, int] = {candidate: 0 for candidate in self.candidates}
+        self._open_database()
+
+        self._io_pool = QThreadPool(self)
+        self._io_pool.setMaxThreadCount(1)
+        self._save_failed.connect(self._on_save_failed)
+        self._vote_rejected.connect(self._on_vote_rejected)
+        self._msg_shown: bool = False
 
         self.set_validators()
         self.connect_buttons()
 
+    @classmethod
+    def _ensure_validators(cls) -> None:
+        """
+            Creates the shared name and digit validators the first time they are needed.
+
+            The validators are parented to the QApplication so they outlive any single window.
+        """
+        if cls._NAME_VALIDATOR is None:
+            cls._NAME_VALIDATOR = QRegularExpressionValidator(cls._NAME_RE, QApplication.instance())
+        if cls._DIGIT_VALIDATOR is None:
+            cls._DIGIT_VALIDATOR = QRegularExpressionValidator(cls._DIGIT_RE, QApplication.instance())
+
     def set_validators(self) -> None:
         """
             Sets input validators for the name and digit fields.
 
             This method applies regular expression validators to ensure that the user inputs are the valid ones.
+            One validator instance is shared by both name fields and one by all five digit fields.
         """
-        name_validator = QRegularExpressionValidator(QRegularExpression("[a-zA-Z-']+"))
-        self.input_first_name.setValidator(name_validator)
-        self.input_last_name.setValidator(name_validator)
+        self._ensure_validators()
+        self.input_first_name.setValidator(self._NAME_VALIDATOR)
+        self.input_last_name.setValidator(self._NAME_VALIDATOR)
 
-        digit_validator = QRegularExpressionValidator(QRegularExpression("[0-9]"))
         for digit_input in self.digit_inputs:
-            digit_input.setValidator(digit_validator)
+            digit_input.setValidator(self._DIGIT_VALIDATOR)
 
     def connect_buttons(self) -> None:
         """
@@ -68,47 +123,40 @@ class Logic(QMainWindow, Ui_MainWindow):
         self.vote_button.clicked.connect(self.process_vote)
         self.result_button.clicked.connect(self.show_results)
 
-        self.input_first_name.textChanged.connect(self.clear_message)
-        self.input_last_name.textChanged.connect(self.clear_message)
-
-        for digit_input in self.digit_inputs:
-            digit_input.textChanged.connect(self.clear_message)
+        for field in self._all_fields:
+            field.textChanged.connect(self.clear_message)
 
     def process_vote(self) -> None:
         """
         Processes the user's vote by validating inputs and saving the vote.
 
         This method checks if the user has provided all necessary information, validates the voting
-        ID, checks for duplicate votes, and saves the vote to a CSV file. It also displays a
+        ID, and saves the vote to the database unless the voting ID has already been used. It also displays a
         success message upon successful voting.
         """
-        if not self.input_first_name.text():
-            return self.show_message("Please provide the first name", self.error_message_color)
         first_name = self.input_first_name.text()
+        if not first_name:
+            return self.show_message("Please provide the first name", self.error_message_color)
 
-        if not self.input_last_name.text():
-            return self.show_message("Please provide the last name", self.error_message_color)
         last_name = self.input_last_name.text()
+        if not last_name:
+            return self.show_message("Please provide the last name", self.error_message_color)
 
-        if not self.get_voting_id():
+        if not all(digit_input.text() for digit_input in self.digit_inputs):
             return self.show_message("Please provide the voting ID", self.error_message_color)
         voting_id = self.get_voting_id()
-        if len(voting_id) != 5:
-            return self.show_message("Voting ID must be 5 digits", self.error_message_color)
 
-        if not (self.first_candidate_button.isChecked() or self.second_candidate_button.isChecked()):
+        checked_button = self.candidate_button_group.checkedButton()
+        if checked_button is None:
             return self.show_message("Please select a candidate to vote for", self.error_message_color)
+        candidate: str = self._btn_to_name[checked_button]
 
-        if self.check_duplicate_vote(voting_id):
-            return self.show_message("This Voting ID has already been used", self.error_message_color)
-
-        candidate: str = self.candidates[0] if self.first_candidate_button.isChecked() else self.candidates[1]
-
-        self.save_vote(first_name, last_name, voting_id, candidate)
+        if not self.save_vote(first_name, last_name, voting_id, candidate):
+            return
         self.clear_form()
 
         self.show_message(f"Thank you {first_name}! You voted for {candidate}!", self.success_message_color)
-        QTimer.singleShot(5000, self.message_label.clear)
+        QTimer.singleShot(5000, self.clear_message)
 
     def get_voting_id(self) -> str:
         """
@@ -117,54 +165,146 @@ class Logic(QMainWindow, Ui_MainWindow):
             Returns:
                 str: The concatenated voting ID from the digit input fields.
         """
-        return ''.join([digit_input.text() for digit_input in self.digit_inputs])
+        first, second, third, fourth, fifth = self.digit_inputs
+        return first.text() + second.text() + third.text() + fourth.text() + fifth.text()
+
+    def _open_database(self) -> None:
+        """
+            Opens the votes database, creating the votes table if needed, and loads the used voting IDs
+            and the vote counts.
 
-    def save_vote(self, first_name: str, last_name: str, voting_id: str, candidate: str) -> None:
+            A new, empty database is filled with the votes from the CSV file of earlier versions, if there is one.
+            If anything fails, the connection is closed and voting is disabled, since duplicate voting IDs
+            could no longer be detected.
         """
-            Saves the vote information to a CSV file.
+        try:
+            self._conn = sqlite3.connect(self.db_file, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS votes("
+                "first_name TEXT, last_name TEXT, voting_id TEXT PRIMARY KEY, candidate TEXT)"
+            )
+            if self._conn.execute("SELECT 1 FROM votes LIMIT 1").fetchone() is None:
+                self._import_csv_votes()
+
+            self._used_ids = {row[0] for row in self._conn.execute("SELECT voting_id FROM votes")}
+            for candidate, count in self._conn.execute("SELECT candidate, COUNT(*) FROM votes GROUP BY candidate"):
+                candidate = sys.intern(candidate)
+                if candidate in self._stats:
+                    self._stats[candidate] = count
+
+        except Exception as e:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+            self.vote_button.setEnabled(False)
+            QMessageBox.warning(self, "ERROR", f"Error opening the votes database: {e}")
+
+    def _import_csv_votes(self) -> None:
+        """
+            Copies the votes from the CSV file of earlier versions into the database.
+
+            Rows with a voting ID that is already in the database are skipped. The file is memory-mapped
+            and split on commas directly, which is safe because the validators keep commas out of every field.
+        """
+        rows = []
+        try:
+            with open(self.csv_file, mode='rb', buffering=0) as file:
+                if os.fstat(file.fileno()).st_size == 0:
+                    return
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    mapped.readline()
+                    for line in iter(mapped.readline, b''):
+                        fields = line.rstrip(b'\r\n').split(b',')
+                        if len(fields) > self._CANDIDATE_COLUMN:
+                            rows.append([field.decode() for field in fields[:self._CANDIDATE_COLUMN + 1]])
+
+        except FileNotFoundError:
+            return
+
+        with self._conn:
+            self._conn.executemany("INSERT OR IGNORE INTO votes VALUES (?, ?, ?, ?)", rows)
+
+    def save_vote(self, first_name: str, last_name: str, voting_id: str, candidate: str) -> bool:
+        """
+            Records the vote if the voting ID has not been used yet and queues it to be written to the database.
+
+            The used voting IDs and the vote counts are updated right away; the database write runs on
+            the I/O thread so a slow disk never blocks the window.
 
             Args:
                 first_name (str): The voter's first name.
                 last_name (str): The voter's last name.
                 voting_id (str): The voter's voting ID.
                 candidate (str): The name of the candidate voted for.
+
+            Returns:
+                bool: True if the vote was accepted, False if the voting ID has already been used or the
+                database is not open.
         """
-        try:
-            if not os.path.exists(self.csv_file):
-                with open(self.csv_file, mode='w', newline='') as file:
-                    writer = csv.writer(file)
-                    writer.writerow(['First Name', 'Last Name', 'Voting ID', 'Voted'])
+        if self._conn is None:
+            self.show_message("Votes cannot be saved right now", self.error_message_color)
+            return False
 
-            with open(self.csv_file, 'a', newline='') as file:
-                writer = csv.writer(file)
-                writer.writerow([first_name, last_name, voting_id, candidate])
+        if voting_id in self._used_ids:
+            self.show_message("This Voting ID has already been used", self.error_message_color)
+            return False
+
+        self._used_ids.add(voting_id)
+        self._stats[candidate] = self._stats.get(candidate, 0) + 1
+        self._io_pool.start(lambda: self._write_vote(first_name, last_name, voting_id, candidate))
+        return True
+
+    def _write_vote(self, first_name: str, last_name: str, voting_id: str, candidate: str) -> None:
+        """
+            Writes one vote to the database. Runs on the I/O thread.
+
+            A voting ID that is already in the database, for example one written by another instance,
+            makes the insert affect no rows and is reported through _vote_rejected.
+
+            Args:
+                first_name (str): The voter's first name.
+                last_name (str): The voter's last name.
+                voting_id (str): The voter's voting ID.
+                candidate (str): The name of the candidate voted for.
+        """
+        try:
+            with self._conn:
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO votes VALUES (?, ?, ?, ?)", (first_name, last_name, voting_id, candidate)
+                )
+            if cursor.rowcount == 0:
+                self._vote_rejected.emit(voting_id, candidate)
 
         except Exception as e:
-            QMessageBox.warning(self, "Saving Error", f"Error saving the vote: {e}")
+            self._save_failed.emit(voting_id, candidate, str(e))
 
-    def check_duplicate_vote(self, voting_id: str) -> bool:
+    def _on_save_failed(self, voting_id: str, candidate: str, error: str) -> None:
         """
-            Checks if the voting ID has already been used.
+            Undoes the in-memory effect of a vote that could not be written and reports the error.
 
             Args:
-                voting_id (str): The voting ID to check.
+                voting_id (str): The voting ID of the vote that failed.
+                candidate (str): The candidate of the vote that failed.
+                error (str): The reason the vote was not written.
+        """
+        self._used_ids.discard(voting_id)
+        self._stats[candidate] -= 1
+        QMessageBox.warning(self, "Saving Error", f"Error saving the vote: {error}")
 
-            Returns:
-                bool: True if the voting ID has been used, False otherwise.
+    def _on_vote_rejected(self, voting_id: str, candidate: str) -> None:
         """
-        try:
-            if not os.path.exists(self.csv_file):
-                return False
+            Takes back the count of a vote whose voting ID was already in the database and reports it.
 
-            with open(self.csv_file, mode='r') as file:
-                reader = csv.DictReader(file)
-                for row in reader:
-                    if row['Voting ID'] == voting_id:
-                        return True
+            The voting ID stays in the used set, since the database shows it has been used.
 
-        except Exception as e:
-            QMessageBox.warning(self, "ERROR", f"Error checking duplicate vote: {e}")
-            return False
+            Args:
+                voting_id (str): The voting ID of the rejected vote.
+                candidate (str): The candidate of the rejected vote.
+        """
+        self._used_ids.add(voting_id)
+        self._stats[candidate] -= 1
+        self.show_message("This Voting ID has already been used", self.error_message_color)
 
     def get_candidate_stats(self) -> dict[str, int]:
         """
@@ -173,20 +313,7 @@ class Logic(QMainWindow, Ui_MainWindow):
             Returns:
                 dict[str, int]: A dictionary with candidate names as keys and their vote counts as values.
         """
-        stats = {candidate: 0 for candidate in self.candidates}
-        try:
-            if not os.path.exists(self.csv_file):
-                return stats
-
-            with open(self.csv_file, mode='r') as file:
-                reader = csv.DictReader(file)
-                for row in reader:
-                    if row['Voted'] in stats:
-                        stats[row['Voted']] += 1
-
-        except Exception as e:
-            QMessageBox.warning(self, "Candidate Stats Error", f"Error getting candidate stats: {e}")
-        return stats
+        return dict(self._stats)
 
     def show_results(self) -> None:
         """
@@ -213,15 +340,18 @@ class Logic(QMainWindow, Ui_MainWindow):
         """
         self.message_label.setText(text)
         self.message_label.setStyleSheet(color)
+        self._msg_shown = True
 
     def clear_message(self) -> None:
         """
             Clears the message label text.
 
             This method is called to reset the message label when the user starts typing in the input
-            fields.
+            fields. The label is only touched when a message is actually shown.
         """
-        self.message_label.clear()
+        if self._msg_shown:
+            self.message_label.clear()
+            self._msg_shown = False
 
     def clear_form(self) -> None:
         """
@@ -229,10 +359,28 @@ class Logic(QMainWindow, Ui_MainWindow):
 
             This method is called to reset the form after a vote has been processed.
         """
-        for field in [self.input_first_name, self.input_last_name] + self.digit_inputs:
+        for field in self._all_fields:
             field.clear()
 
-        if self.candidate_button_group.checkedButton() is not None:
-            self.candidate_button_group.setExclusive(False)
-            self.candidate_button_group.checkedButton().setChecked(False)
-            self.candidate_button_group.setExclusive(True)
\ No newline at end of file
+        checked_button = self.candidate_button_group.checkedButton()
+        if checked_button is not None:
+            button_group = self.candidate_button_group
+            button_group.setExclusive(False)
+            checked_button.setChecked(False)
+            button_group.setExclusive(True)
+
+    def closeEvent(self, event) -> None:
+        """
+            Waits for queued votes to be written, then closes the votes database before the window closes.
+
+            Failures queued by the last writes are delivered first, so they are still reported and rolled back.
+
+            Args:
+                event (QCloseEvent): The close event sent by Qt.
+        """
+        self._io_pool.waitForDone()
+        QCoreApplication.sendPostedEvents(self)
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+        super().closeEvent(event)
\ No newline at end of file